@@ -91,6 +91,8 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Keep connections alive between requests instead of reconnecting per request
+        'CONN_MAX_AGE': 60,
     }
 }
 
@@ -17,14 +17,16 @@ class CategoryAdmin(DraggableMPTTAdmin):
 class ArticleAdmin(admin.ModelAdmin):
     prepopulated_fields = {'slug': ('title',)}
 
+    def get_queryset(self, request):
+        return Article.objects.for_admin()
+
 
 @admin.register(Comment)
-class CommentAdminPage(DraggableMPTTAdmin):
+class CommentAdminPage(admin.ModelAdmin):
     """
     Админ-панель модели комментариев
     """
-    list_display = ('tree_actions', 'indented_title', 'article', 'author', 'time_create', 'status')
-    mptt_level_indent = 2
+    list_display = ('article', 'author', 'parent', 'time_create', 'status')
     list_display_links = ('article',)
     list_filter = ('time_create', 'time_update', 'author')
 
@@ -1,8 +1,70 @@
+import time
+import threading
+
 from .models import ViewCount
 
 from modules.services.utils import get_client_ip
 
 
+# Буфер просмотров: записи накапливаются в памяти и сбрасываются в БД
+# одним bulk_create вместо INSERT на каждый запрос
+
+VIEW_BUFFER_MAX_SIZE = 100
+
+VIEW_BUFFER_MAX_AGE = 5  # секунд
+
+_view_buffer = []
+
+_buffered_keys = set()
+
+_view_buffer_lock = threading.Lock()
+
+_last_flush = time.monotonic()
+
+
+def record_view(article, ip_address):
+
+    """
+
+    Регистрация просмотра статьи через буфер с отложенной пакетной записью
+
+    """
+
+    if ViewCount.objects.filter(article=article, ip_address=ip_address).exists():
+
+        return
+
+    global _last_flush
+
+    key = (article.pk, ip_address)
+
+    with _view_buffer_lock:
+
+        # повторный просмотр до сброса буфера: exists() его ещё не видит
+
+        if key in _buffered_keys:
+
+            return
+
+        _buffered_keys.add(key)
+
+        _view_buffer.append(ViewCount(article=article, ip_address=ip_address))
+
+        expired = time.monotonic() - _last_flush >= VIEW_BUFFER_MAX_AGE
+
+        if len(_view_buffer) < VIEW_BUFFER_MAX_SIZE and not expired:
+
+            return
+
+        batch, _view_buffer[:] = _view_buffer[:], []
+
+        _buffered_keys.clear()
+
+        _last_flush = time.monotonic()
+
+    ViewCount.objects.bulk_create(batch, batch_size=1000, ignore_conflicts=True)
+
+
 class ViewCountMixin:
 
     """
@@ -21,8 +83,8 @@ class ViewCountMixin:
 
         ip_address = get_client_ip(self.request)
 
-        # получаем или создаем запись о просмотре статьи для данного пользователя
+        # записываем просмотр статьи в буфер пакетной записи
 
-        ViewCount.objects.get_or_create(article=obj, ip_address=ip_address)
+        record_view(obj, ip_address)
 
-        return obj
\ No newline at end of file
+        return obj
@@ -1,14 +1,23 @@
-from django.db import models
+from uuid import uuid4
+
+from django.core.cache import cache
+from django.db import IntegrityError, models, transaction
+from django.db.models import Count, F, Prefetch, Q, Sum
+from django.db.models.functions import Coalesce
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
 
 from django.core.validators import FileExtensionValidator
 from django.contrib.auth import get_user_model
 from mptt.models import MPTTModel, TreeForeignKey
+from tree_queries.fields import TreeNodeForeignKey
+from tree_queries.models import TreeNode
 from django.urls import reverse
+from django.utils.functional import cached_property
+from pytils.translit import slugify
 from taggit.managers import TaggableManager
 from django_ckeditor_5.fields import CKEditor5Field
 
-from modules.services.utils import unique_slugify
-
 
 User = get_user_model()
 
@@ -56,9 +65,16 @@ class Category(MPTTModel):
         return self.title
 
 
-    def get_absolute_url(self):
+    @cached_property
+    def absolute_url(self):
+        """
+        URL категории (reverse() вычисляется один раз на экземпляр)
+        """
         return reverse('articles_by_category', kwargs={'slug': self.slug})
 
+    def get_absolute_url(self):
+        return self.absolute_url
+
 
 
 
@@ -75,16 +91,65 @@ class Article(models.Model):
             """
             Список статей (SQL запрос с фильтрацией страницы списка статей)
             """
-            return self.get_queryset().select_related('author', 'category').prefetch_related('ratings').filter(status='published')
+            # updater намеренно не входит в only(): поле нужно только в админке (см. for_admin)
+            # от категории списку нужны только slug и title — аннотации вместо join всей строки
+            return self.get_queryset()\
+                .select_related('author')\
+                .only(
+                    'id', 'title', 'slug', 'short_description', 'thumbnail', 'status', 'time_create', 'fixed',
+                    'rating_sum', 'rating_count',
+                    'author__id', 'author__username',
+                )\
+                .annotate(cat_slug=F('category__slug'), cat_title=F('category__title'))\
+                .filter(status='published')
+
+        def detail_cached(self, slug):
+            """
+            Детальная статья из кэша (SQL выполняется только при промахе,
+            инвалидация — сигналами Article/Comment/Rating)
+            """
+            key = f'art:{slug}'
+            article = cache.get(key)
+            if article is None:
+                article = self.detail().get(slug=slug)
+                cache.set(key, article, 300)
+            return article
+
+        def stream(self, chunk_size=500):
+            """
+            Потоковый обход статей для пакетных задач (экспорт, скрипты):
+            iterator() держит в памяти только текущую порцию строк,
+            что важно при больших CKEditor-полях
+            """
+            return self.get_queryset().only('id', 'slug', 'title').iterator(chunk_size=chunk_size)
+
+        def for_admin(self):
+            """
+            Статьи для админ-панели (с автором, редактором и категорией без доп. запросов)
+            """
+            return self.get_queryset().select_related('author', 'updater', 'category')
 
         def detail(self):
             """
             Детальная статья (SQL запрос с фильтрацией страницы со статьёй)
+
+            Базовый queryset собирается один раз и переиспользуется,
+            чтобы не перестраивать граф prefetch на каждый запрос
             """
-            return self.get_queryset()\
-                .select_related('author', 'category')\
-                .prefetch_related('comments', 'comments__author', 'comments__author__profile', 'tags', 'ratings')\
-                .filter(status='published')
+            base = getattr(self, '_detail_queryset', None)
+            if base is None:
+                base = self.get_queryset()\
+                    .select_related('author', 'category')\
+                    .prefetch_related(
+                        Prefetch('comments', queryset=Comment.objects.with_tree_fields().select_related('author', 'author__profile').filter(status='published')),
+                        # tags: taggit не поддерживает кастомные querysets в Prefetch,
+                        # а ArrayAgg доступен только на Postgres — остаётся штатный prefetch
+                        'tags',
+                        'ratings',
+                    )\
+                    .filter(status='published')
+                self._detail_queryset = base
+            return base.all()
              
 
     STATUS_OPTIONS = (
@@ -94,8 +159,6 @@ class Article(models.Model):
 
     title = models.CharField(verbose_name='Заголовок', max_length=255)
     slug = models.SlugField(verbose_name='Альт.название', max_length=255, blank=True, unique=True)
-    short_description = models.TextField(verbose_name='Краткое описание', max_length=500)
-    full_description = models.TextField(verbose_name='Текст статьи')
 
     thumbnail = models.ImageField(
         verbose_name='Превью поста',
@@ -113,6 +176,8 @@ class Article(models.Model):
     updater = models.ForeignKey(to=User, verbose_name='Обновил', on_delete=models.SET_NULL, null=True,
                                 related_name='updater_posts', blank=True)
     fixed = models.BooleanField(verbose_name='Зафиксировано', default=False)
+    rating_sum = models.IntegerField(verbose_name='Сумма рейтинга', default=0, db_index=True)
+    rating_count = models.IntegerField(verbose_name='Количество оценок', default=0)
     category = TreeForeignKey('Category', on_delete=models.PROTECT, related_name='articles', verbose_name='Категория')
     objects = ArticleManager()
     tags = TaggableManager()
@@ -123,39 +188,70 @@ class Article(models.Model):
     class Meta:
         db_table = 'app_articles'
         ordering = ['-time_create', '-fixed']
-        indexes = [models.Index(fields=['-time_create', '-fixed'])]
+        indexes = [
+            models.Index(fields=['-time_create', '-fixed']),
+            models.Index(fields=['status', '-time_create', '-fixed'], name='art_status_time_fixed_idx'),
+        ]
         verbose_name = 'Статья'
         verbose_name_plural = 'Статьи'
 
     def __str__(self):
         return self.title
 
-    def get_absolute_url(self):
+    @cached_property
+    def absolute_url(self):
+        """
+        URL статьи (reverse() вычисляется один раз на экземпляр)
+        """
         return reverse('articles_detail', kwargs={'slug': self.slug})
 
+    def get_absolute_url(self):
+        return self.absolute_url
+
     def save(self, *args, **kwargs):
         """
         Сохранение полей модели при их отсутствии заполнения
 
+        SLUG строится детерминированно, без цикла SELECT-проверок уникальности:
+        коллизию ловит уникальный индекс, после чего делается один повтор с суффиксом
         """
         if not self.slug:
-            self.slug = unique_slugify(self, self.title)
+            self.slug = slugify(self.title)[:240]
+            try:
+                with transaction.atomic():
+                    super().save(*args, **kwargs)
+            except IntegrityError:
+                self.slug = f'{self.slug}-{uuid4().hex[:8]}'
+                super().save(*args, **kwargs)
+            return
         super().save(*args, **kwargs)
 
     def get_sum_rating(self):
-        return sum([rating.value for rating in self.ratings.all()]) 
+        """
+        Сумма рейтинга статьи (денормализованный счётчик, обновляется сигналами модели Rating)
+        """
+        return self.rating_sum
     
 # Мои изменения кнопки Редактировать
-    def get_editor_url(self):
+    @cached_property
+    def editor_url(self):
         return reverse('articles_update', kwargs={'slug': self.slug})
-    
-    def get_delete_url(self):
+
+    def get_editor_url(self):
+        return self.editor_url
+
+    @cached_property
+    def delete_url(self):
         return reverse('articles_delete', kwargs={'slug': self.slug})
 
+    def get_delete_url(self):
+        return self.delete_url
+
 
-class Comment(MPTTModel):
+class Comment(TreeNode):
     """
-    Модель древовидных комментариев
+    Модель древовидных комментариев (adjacency list + рекурсивный CTE
+    вместо MPTT: вставка — один INSERT без перестройки lft/rght)
     """
     STATUS_OPTIONS = (
         ('published', 'Опубликовано'),
@@ -169,18 +265,13 @@ class Comment(MPTTModel):
     time_create = models.DateTimeField(verbose_name='Время добавления', auto_now_add=True)
     time_update = models.DateTimeField(verbose_name='Время обновления', auto_now=True)
     status = models.CharField(choices=STATUS_OPTIONS, default='published', verbose_name='Статус поста', max_length=10)
-    parent = TreeForeignKey('self', verbose_name='Родительский комментарий', null=True, blank=True,
-                            related_name='children', on_delete=models.CASCADE)
-
-
-    class MTTMeta:
-        order_insertion_by = ('-time_create',)
-
+    parent = TreeNodeForeignKey('self', verbose_name='Родительский комментарий', null=True, blank=True,
+                                related_name='children', on_delete=models.CASCADE)
 
 
     class Meta:
         db_table = 'app_comments'
-        indexes = [models.Index(fields=['-time_create', 'time_update', 'status', 'parent'])]
+        indexes = [models.Index(fields=['article', 'status'], name='cmt_article_status_idx')]
         ordering = ['-time_create']
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
@@ -193,7 +284,7 @@ class Rating(models.Model):
     """
     article = models.ForeignKey(to=Article, verbose_name='Статья', on_delete=models.CASCADE, related_name='ratings')
     user = models.ForeignKey(to=User, verbose_name='Пользователь', on_delete=models.CASCADE, blank=True, null=True)
-    value = models.IntegerField(verbose_name='Значение', choices=[(1, 'Нравится'), (-1, 'Не нравится')])
+    value = models.SmallIntegerField(verbose_name='Значение', choices=[(1, 'Нравится'), (-1, 'Не нравится')])
     time_create = models.DateTimeField(verbose_name='Время добавления', auto_now_add=True)
     ip_address = models.GenericIPAddressField(verbose_name='IP Адрес')
 
@@ -201,15 +292,47 @@ class Rating(models.Model):
         unique_together = ('article', 'ip_address')
         ordering = ('-time_create',)
         indexes = [models.Index(fields=['-time_create', 'value'])]
+        constraints = [models.CheckConstraint(condition=Q(value__in=[-1, 1]), name='rating_value_valid')]
         verbose_name = 'Рейтинг'
         verbose_name_plural = 'Рейтинги'
  
     def __str__(self):
         return self.article.title
 
-    def __str__(self):
-        return f'{self.author}:{self.content}'
-    
+
+@receiver([post_save, post_delete], sender=Rating)
+def update_article_rating_aggregates(sender, instance, **kwargs):
+    """
+    Обновление денормализованных счётчиков рейтинга статьи при изменении оценок
+    """
+    aggregates = Rating.objects.filter(article_id=instance.article_id).aggregate(
+        total=Coalesce(Sum('value'), 0),
+        count=Count('id'),
+    )
+    Article.objects.filter(pk=instance.article_id).update(
+        rating_sum=aggregates['total'],
+        rating_count=aggregates['count'],
+    )
+
+
+@receiver([post_save, post_delete], sender=Article)
+def invalidate_article_detail_cache(sender, instance, **kwargs):
+    """
+    Сброс кэша детальной статьи при её изменении или удалении
+    """
+    cache.delete(f'art:{instance.slug}')
+
+
+@receiver([post_save, post_delete], sender=Comment)
+@receiver([post_save, post_delete], sender=Rating)
+def invalidate_article_detail_cache_on_related(sender, instance, **kwargs):
+    """
+    Сброс кэша детальной статьи при изменении её комментариев или оценок
+    """
+    slug = Article.objects.filter(pk=instance.article_id).values_list('slug', flat=True).first()
+    if slug:
+        cache.delete(f'art:{slug}')
+
 
 class ViewCount(models.Model):
     """
@@ -223,7 +346,10 @@ class ViewCount(models.Model):
 
     class Meta:
         ordering = ('-viewed_on',)
-        indexes = [models.Index(fields=['-viewed_on'])]
+        indexes = [
+            models.Index(fields=['-viewed_on']),
+            models.Index(fields=['article', 'ip_address', '-viewed_on'], name='vc_art_ip_time'),
+        ]
         verbose_name = 'Просмотр'
         verbose_name_plural = 'Просмотры'
     
@@ -1,4 +1,4 @@
-from django.http import JsonResponse
+from django.http import Http404, JsonResponse
 
 from django.views.generic import ListView, DetailView, CreateView, UpdateView, DeleteView, View
 from django.contrib.auth.mixins import LoginRequiredMixin
@@ -38,6 +38,12 @@ class ArticleDetailView(DetailView):
     context_object_name = 'article'
     queryset = model.objects.detail()
 
+    def get_object(self, queryset=None):
+        try:
+            return self.model.objects.detail_cached(self.kwargs['slug'])
+        except self.model.DoesNotExist:
+            raise Http404('Статья не найдена')
+
     def get_similar_articles(self, obj):
 
         article_tags_ids = obj.tags.values_list('id', flat=True)
@@ -160,7 +166,7 @@ class CommentCreateView(LoginRequiredMixin, CreateView):
 
         if self.is_ajax():
             return JsonResponse({
-                'is_child': comment.is_child_node(),
+                'is_child': comment.parent_id is not None,
                 'id': comment.id,
                 'author': comment.author.username,
                 'parent_id': comment.parent_id,
@@ -202,22 +208,18 @@ class RatingCreateView(View):
         ip_address = get_client_ip(request)
         user = request.user if request.user.is_authenticated else None
 
-        rating, created = self.model.objects.get_or_create(
+        # повторное нажатие той же кнопки снимает оценку
+        deleted, _ = self.model.objects.filter(article_id=article_id, ip_address=ip_address, value=value).delete()
+        if deleted:
+            rating_sum = Article.objects.values_list('rating_sum', flat=True).get(pk=article_id)
+            return JsonResponse({'status': 'deleted', 'rating_sum': rating_sum})
+
+        rating, created = self.model.objects.update_or_create(
             article_id=article_id,
             ip_address=ip_address,
             defaults={'value': value, 'user': user},
         )
-
-        if not created:
-            if rating.value == value:
-                rating.delete()
-                return JsonResponse({'status': 'deleted', 'rating_sum': rating.article.get_sum_rating()})
-            else:
-                rating.value = value
-                rating.user = user
-                rating.save()
-                return JsonResponse({'status': 'updated', 'rating_sum': rating.article.get_sum_rating()})
-        return JsonResponse({'status': 'created', 'rating_sum': rating.article.get_sum_rating()})
+        return JsonResponse({'status': 'created' if created else 'updated', 'rating_sum': rating.article.get_sum_rating()})
 
 
 class ArticleBySignedUser(LoginRequiredMixin, ListView):